@@ -1,6 +1,8 @@
 import base64
+import binascii
 import os
-from typing import Any, Dict, List, Tuple
+import re
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import requests
@@ -18,11 +20,36 @@ if platform.system() == "Darwin":
 from gui_agents.s1.aci.ACI import ACI, agent_action
 
 
+# Roles filtered out of the linearized tree; shared across calls
+EXCLUDE_ROLES = frozenset({"AXGroup", "AXLayoutArea", "AXLayoutItem", "AXUnknown"})
+
+
 def _normalize_key(key: str) -> str:
     """Convert 'cmd' to 'command' for pyautogui compatibility"""
     return "command" if key == "cmd" else key
 
 
+# Precompiled patterns for pulling coordinates out of AXValue reprs such as
+# "<AXValue ... x:100.0 y:200.0>"; compiled once instead of scanning the
+# repr token-by-token on every node
+_AX_POSITION_RE = re.compile(r"(?<!\w)x:(-?\d+(?:\.\d+)?).*?(?<!\w)y:(-?\d+(?:\.\d+)?)")
+_AX_SIZE_RE = re.compile(r"(?<!\w)w:(-?\d+(?:\.\d+)?).*?(?<!\w)h:(-?\d+(?:\.\d+)?)")
+
+
+def _parse_ax_position(value) -> Optional[Tuple[float, float]]:
+    match = _AX_POSITION_RE.search(repr(value))
+    if match is None:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
+def _parse_ax_size(value) -> Optional[Tuple[float, float]]:
+    match = _AX_SIZE_RE.search(repr(value))
+    if match is None:
+        return None
+    return float(match.group(1)), float(match.group(2))
+
+
 def list_apps_in_directories(directories):
     apps = []
     for directory in directories:
@@ -53,8 +80,11 @@ class MacOSACI(ACI):
 
         preserved_nodes = []
 
-        # Inner function to recursively traverse the accessibility tree
-        def traverse_and_preserve(element):
+        # Traverse the accessibility tree iteratively with an explicit stack
+        # to avoid recursion-depth limits on deep trees
+        stack = [tree]
+        while stack:
+            element = stack.pop()
             role = element.attribute("AXRole")
 
             if role not in exclude_roles:
@@ -62,27 +92,10 @@ class MacOSACI(ACI):
                 position = element.attribute("AXPosition")
                 size = element.attribute("AXSize")
                 if position and size:
-                    pos_parts = position.__repr__().split().copy()
-                    # Find the parts containing 'x:' and 'y:'
-                    x_part = next(part for part in pos_parts if part.startswith("x:"))
-                    y_part = next(part for part in pos_parts if part.startswith("y:"))
-
-                    # Extract the numerical values after 'x:' and 'y:'
-                    x = float(x_part.split(":")[1])
-                    y = float(y_part.split(":")[1])
-
-                    size_parts = size.__repr__().split().copy()
-                    # Find the parts containing 'Width:' and 'Height:'
-                    width_part = next(
-                        part for part in size_parts if part.startswith("w:")
-                    )
-                    height_part = next(
-                        part for part in size_parts if part.startswith("h:")
-                    )
-
-                    # Extract the numerical values after 'Width:' and 'Height:'
-                    w = float(width_part.split(":")[1])
-                    h = float(height_part.split(":")[1])
+                    parsed_position = _parse_ax_position(position)
+                    parsed_size = _parse_ax_size(size)
+                    x, y = parsed_position if parsed_position else (-1.0, -1.0)
+                    w, h = parsed_size if parsed_size else (-1.0, -1.0)
 
                     if x >= 0 and y >= 0 and w > 0 and h > 0:
                         preserved_nodes.append(
@@ -98,12 +111,9 @@ class MacOSACI(ACI):
 
             children = element.children()
             if children:
-                for child_ref in children:
-                    child_element = UIElement(child_ref)
-                    traverse_and_preserve(child_element)
-
-        # Start traversing from the given element
-        traverse_and_preserve(tree)
+                # Push in reverse so children are visited in document order
+                for child_ref in reversed(children):
+                    stack.append(UIElement(child_ref))
 
         return preserved_nodes
 
@@ -112,7 +122,7 @@ class MacOSACI(ACI):
         if not url:
             raise EnvironmentError("OCR SERVER ADDRESS NOT SET")
 
-        encoded_screenshot = base64.b64encode(screenshot).decode("utf-8")
+        encoded_screenshot = binascii.b2a_base64(screenshot, newline=False).decode("ascii")
         response = requests.post(url, json={"img_bytes": encoded_screenshot})
 
         if response.status_code != 200:
@@ -132,22 +142,15 @@ class MacOSACI(ACI):
         Add OCR-detected elements to the accessibility tree if they don't overlap with existing elements
         Uses optimized NumPy implementation
         """
-        # Convert preserved nodes to numpy array of bounding boxes
-        if preserved_nodes:
-            tree_bboxes = np.array(
-                [
-                    [
-                        node["position"][0],
-                        node["position"][1],
-                        node["position"][0] + node["size"][0],
-                        node["position"][1] + node["size"][1],
-                    ]
-                    for node in preserved_nodes
-                ],
-                dtype=np.float32,
-            )
-        else:
-            tree_bboxes = np.empty((0, 4), dtype=np.float32)
+        # Write preserved node bounding boxes straight into a contiguous
+        # float32 array instead of materializing an intermediate list of lists
+        tree_bboxes = np.empty((len(preserved_nodes), 4), dtype=np.float32)
+        for idx, node in enumerate(preserved_nodes):
+            position, size = node["position"], node["size"]
+            tree_bboxes[idx, 0] = position[0]
+            tree_bboxes[idx, 1] = position[1]
+            tree_bboxes[idx, 2] = position[0] + size[0]
+            tree_bboxes[idx, 3] = position[1] + size[1]
 
         try:
             ocr_bboxes = self.extract_elements_from_screenshot(screenshot)
@@ -213,8 +216,7 @@ class MacOSACI(ACI):
             NSWorkspace.sharedWorkspace().frontmostApplication().localizedName()
         )
         tree = UIElement(accessibility_tree.attribute("AXFocusedApplication"))
-        exclude_roles = ["AXGroup", "AXLayoutArea", "AXLayoutItem", "AXUnknown"]
-        preserved_nodes = self.preserve_nodes(tree, exclude_roles).copy()
+        preserved_nodes = self.preserve_nodes(tree, EXCLUDE_ROLES).copy()
         tree_elements = ["id\trole\ttitle\ttext"]
         for idx, node in enumerate(preserved_nodes):
             tree_elements.append(
@@ -494,30 +496,13 @@ class UIElement(object):
         pos = self.attribute("AXPosition")
         if pos is None:
             return None
-        pos_parts = pos.__repr__().split().copy()
-        # Find the parts containing 'x:' and 'y:'
-        x_part = next(part for part in pos_parts if part.startswith("x:"))
-        y_part = next(part for part in pos_parts if part.startswith("y:"))
-
-        # Extract the numerical values after 'x:' and 'y:'
-        x = float(x_part.split(":")[1])
-        y = float(y_part.split(":")[1])
-
-        return (x, y)
+        return _parse_ax_position(pos)
 
     def size(self):
         size = self.attribute("AXSize")
         if size is None:
             return None
-        size_parts = size.__repr__().split().copy()
-        # Find the parts containing 'Width:' and 'Height:'
-        width_part = next(part for part in size_parts if part.startswith("w:"))
-        height_part = next(part for part in size_parts if part.startswith("h:"))
-
-        # Extract the numerical values after 'Width:' and 'Height:'
-        w = float(width_part.split(":")[1])
-        h = float(height_part.split(":")[1])
-        return (w, h)
+        return _parse_ax_size(size)
 
     def isValid(self):
         if self.position() is not None and self.size() is not None:
@@ -1,4 +1,5 @@
 import base64
+import binascii
 import os
 import platform
 from typing import Any, Dict, List, Tuple
@@ -91,7 +92,7 @@ class WindowsACI(ACI):
         if not url:
             raise EnvironmentError("OCR SERVER ADDRESS NOT SET")
 
-        encoded_screenshot = base64.b64encode(screenshot).decode("utf-8")
+        encoded_screenshot = binascii.b2a_base64(screenshot, newline=False).decode("ascii")
         response = requests.post(url, json={"img_bytes": encoded_screenshot})
 
         if response.status_code != 200:
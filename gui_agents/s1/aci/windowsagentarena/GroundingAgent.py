@@ -1,4 +1,5 @@
 import base64
+import binascii
 import logging
 import os
 import time
@@ -6,7 +7,7 @@ import xml.etree.ElementTree as ET
 from typing import Dict, List, Tuple
 import numpy as np
 import requests
-from gui_agents.s1.utils.common_utils import box_iou
+from gui_agents.s1.utils.common_utils import box_iou, parse_coordinate_string
 
 logger = logging.getLogger("desktopenv.agent")
 
@@ -14,23 +15,17 @@ logger = logging.getLogger("desktopenv.agent")
 state_ns = "uri:deskat:state.at-spi.gnome.org"
 component_ns = "uri:deskat:component.at-spi.gnome.org"
 
-
-# Agent action decorator
-def agent_action(func):
-    func.is_agent_action = True
-    return func
+# Fully-qualified attribute keys, formatted once instead of per node lookup
+ACTIVE_KEY = "{{{:}}}active".format(state_ns)
+ENABLED_KEY = "{{{:}}}enabled".format(state_ns)
+VISIBLE_KEY = "{{{:}}}visible".format(state_ns)
+SCREENCOORD_KEY = "{{{:}}}screencoord".format(component_ns)
+SIZE_KEY = "{{{:}}}size".format(component_ns)
 
 
-class GroundingAgent:
-    def __init__(self, vm_version: str, top_app=None, top_app_only=True, ocr=True):
-        self.active_apps = set()
-        self.top_app = top_app
-        self.top_app_only = (
-            top_app_only  # Only include top app in the accessibility tree
-        )
-        self.ocr = ocr
-        self.index_out_of_range_flag = False
-        self.app_setup_code = f"""import subprocess;
+# Template pyautogui code for focusing and maximizing an application window;
+# built once at import time, APP_NAME is substituted when it is used
+APP_SETUP_CODE = """import subprocess;
 import difflib;
 import pyautogui;
 pyautogui.press('escape');
@@ -49,6 +44,30 @@ subprocess.run(['wmctrl', '-ia', window_id])
 subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_horz'])
 """
 
+
+# Tags filtered out of the linearized tree; shared across calls
+EXCLUDE_TAGS = frozenset(
+    {"panel", "window", "filler", "frame", "separator", "scroll-bar"}
+)
+
+
+# Agent action decorator
+def agent_action(func):
+    func.is_agent_action = True
+    return func
+
+
+class GroundingAgent:
+    def __init__(self, vm_version: str, top_app=None, top_app_only=True, ocr=True):
+        self.active_apps = set()
+        self.top_app = top_app
+        self.top_app_only = (
+            top_app_only  # Only include top app in the accessibility tree
+        )
+        self.ocr = ocr
+        self.index_out_of_range_flag = False
+        self.app_setup_code = APP_SETUP_CODE
+
         self.top_active_app = None
         self.notes = []
         self.clipboard = ""
@@ -85,7 +104,7 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         for application in list(tree.getroot()):
             app_name = application.get("name")
             for frame in application:
-                is_active = frame.attrib.get("{{{:}}}active".format(state_ns), "false")
+                is_active = frame.attrib.get(ACTIVE_KEY, "false")
                 if is_active == "true":
                     apps_with_active_tag.append(app_name)
         print(apps_with_active_tag)
@@ -97,7 +116,7 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         for application in list(tree.getroot()):
             app_name = application.attrib.get("name")
             for frame in application:
-                is_active = frame.attrib.get("{{{:}}}active".format(state_ns), "false")
+                is_active = frame.attrib.get(ACTIVE_KEY, "false")
                 if is_active == "true":
                     return app_name
         return None
@@ -106,26 +125,21 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         # created and populate a preserved nodes list which filters out unnecessary elements and keeps only those elements which are currently showing on the screen
         # TODO: include offscreen elements and then scroll to them before clicking
         preserved_nodes = []
-        exclude_tags = ["panel", "window", "filler", "frame", "separator", "scroll-bar"]
 
         for node in tree.iter():
-            if node.tag not in exclude_tags:
+            if node.tag not in EXCLUDE_TAGS:
                 if show_all:
-                    if node.attrib.get(f"{{{state_ns}}}enabled") == "true":
-                        coords: Tuple[int, int] = eval(
-                            node.get(
-                                "{{{:}}}screencoord".format(component_ns), "(-1, -1)"
-                            )
+                    if node.attrib.get(ENABLED_KEY) == "true":
+                        coords: Tuple[int, int] = parse_coordinate_string(
+                            node.get(SCREENCOORD_KEY)
                         )
                         if coords[0] >= 0 and coords[1] >= 0:
                             preserved_nodes.append(node)
                 # if show_all is false, only show elements that are currently showing on screen
                 else:
-                    if node.attrib.get(f"{{{state_ns}}}visible") == "true":
-                        coords: Tuple[int, int] = eval(
-                            node.get(
-                                "{{{:}}}screencoord".format(component_ns), "(-1, -1)"
-                            )
+                    if node.attrib.get(VISIBLE_KEY) == "true":
+                        coords: Tuple[int, int] = parse_coordinate_string(
+                            node.get(SCREENCOORD_KEY)
                         )
 
                         if coords[0] >= 0 and coords[1] >= 0:
@@ -170,7 +184,7 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
             url = "http://127.0.0.1:8083/ocr/"
             if url == "":
                 raise Exception("OCR SERVER ADDRESS NOT SET")
-            encoded_screenshot = base64.b64encode(screenshot).decode("utf-8")
+            encoded_screenshot = binascii.b2a_base64(screenshot, newline=False).decode("ascii")
             data = {"img_bytes": encoded_screenshot}
             response = requests.post(url, json=data)
 
@@ -187,23 +201,18 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
     def add_ocr_elements(
         self, screenshot, linearized_accessibility_tree, preserved_nodes
     ):
-        # Get the bounding boxes of the elements in the linearized accessibility tree
-        tree_bboxes = []
-        for node in preserved_nodes:
-            coordinates: Tuple[int, int] = eval(
-                node.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-            )
-            sizes: Tuple[int, int] = eval(
-                node.get("{{{:}}}size".format(component_ns), "(-1, -1)")
-            )
-            tree_bboxes.append(
-                [
-                    coordinates[0],
-                    coordinates[1],
-                    coordinates[0] + sizes[0],
-                    coordinates[1] + sizes[1],
-                ]
+        # Get the bounding boxes of the elements in the linearized accessibility
+        # tree, written straight into a contiguous float32 array
+        tree_bboxes = np.empty((len(preserved_nodes), 4), dtype=np.float32)
+        for idx, node in enumerate(preserved_nodes):
+            coordinates: Tuple[int, int] = parse_coordinate_string(
+                node.get(SCREENCOORD_KEY)
             )
+            sizes: Tuple[int, int] = parse_coordinate_string(node.get(SIZE_KEY))
+            tree_bboxes[idx, 0] = coordinates[0]
+            tree_bboxes[idx, 1] = coordinates[1]
+            tree_bboxes[idx, 2] = coordinates[0] + sizes[0]
+            tree_bboxes[idx, 3] = coordinates[1] + sizes[1]
 
         # Use OCR to found boxes that might be missing from the accessibility tree
         try:
@@ -217,25 +226,34 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
                 len(ocr_bboxes) > 0
             ):  # Only check IOUs and add if there are any bounding boxes returned by the ocr module
                 preserved_nodes_index = len(preserved_nodes)
-                for ind, (i, content, box) in enumerate(ocr_bboxes):
-                    # x1, y1, x2, y2 = int(box.get('left', 0)), int(box['top']), int(), int(box['bottom'])
-                    (
-                        x1,
-                        y1,
-                        x2,
-                        y2,
-                    ) = (
+
+                # Batch all OCR boxes into a single IOU computation against
+                # the tree boxes instead of one box_iou call per OCR box
+                ocr_boxes_array = np.array(
+                    [
+                        [
+                            int(box.get("left", 0)),
+                            int(box.get("top", 0)),
+                            int(box.get("right", 0)),
+                            int(box.get("bottom", 0)),
+                        ]
+                        for _, _, box in ocr_bboxes
+                    ],
+                    dtype=np.float32,
+                )
+                if len(tree_bboxes) > 0:
+                    max_ious = box_iou(tree_bboxes, ocr_boxes_array).max(axis=0)
+                else:
+                    max_ious = np.zeros(len(ocr_boxes_array))
+
+                for (i, content, box), max_iou in zip(ocr_bboxes, max_ious):
+                    x1, y1, x2, y2 = (
                         int(box.get("left", 0)),
                         int(box.get("top", 0)),
                         int(box.get("right", 0)),
                         int(box.get("bottom", 0)),
                     )
-                    iou = box_iou(
-                        np.array(tree_bboxes, dtype=np.float32),
-                        np.array([[x1, y1, x2, y2]], dtype=np.float32),
-                    ).flatten()
-
-                    if max(iou) < 0.1:
+                    if max_iou < 0.1:
                         # Add the element to the linearized accessibility tree
                         # TODO: ocr detected elements should be classified for their tag, currently set to push button for the agent to think they are interactable
                         linearized_accessibility_tree.append(
@@ -247,12 +265,8 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
                             "ocr_node",
                             attrib={
                                 "text": content,
-                                "{{{}}}screencoord".format(
-                                    component_ns
-                                ): "({},{})".format(x1, y1),
-                                "{{{}}}size".format(component_ns): "({},{})".format(
-                                    x2 - x1, y2 - y1
-                                ),
+                                SCREENCOORD_KEY: "({},{})".format(x1, y1),
+                                SIZE_KEY: "({},{})".format(x2 - x1, y2 - y1),
                             },
                         )
                         preserved_nodes.append(node)
@@ -305,13 +319,17 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         return linearized_accessibility_tree
 
     def find_element(self, element_id):
+        # Normalize the id once and bounds-check it instead of relying on
+        # an exception-driven lookup
         try:
-            selected_element = self.nodes[int(element_id)]
-        except:
-            print("The index of the selected element was out of range.")
-            selected_element = self.nodes[0]
-            self.index_out_of_range_flag = True
-        return selected_element
+            index = int(element_id)
+        except (TypeError, ValueError):
+            index = -1
+        if 0 <= index < len(self.nodes):
+            return self.nodes[index]
+        print("The index of the selected element was out of range.")
+        self.index_out_of_range_flag = True
+        return self.nodes[0]
 
     @agent_action
     def click(
@@ -329,12 +347,10 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
             hold_keys:List, list of keys to hold while clicking
         """
         node = self.find_element(element_id)
-        coordinates: Tuple[int, int] = eval(
-            node.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-        )
-        sizes: Tuple[int, int] = eval(
-            node.get("{{{:}}}size".format(component_ns), "(-1, -1)")
+        coordinates: Tuple[int, int] = parse_coordinate_string(
+            node.get(SCREENCOORD_KEY)
         )
+        sizes: Tuple[int, int] = parse_coordinate_string(node.get(SIZE_KEY))
 
         # Calculate the center of the element
         x = coordinates[0] + sizes[0] // 2
@@ -380,10 +396,8 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
 
         if node is not None:
             # If a node is found, retrieve its coordinates and size
-            coordinates = eval(
-                node.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-            )
-            sizes = eval(node.get("{{{:}}}size".format(component_ns), "(-1, -1)"))
+            coordinates = parse_coordinate_string(node.get(SCREENCOORD_KEY))
+            sizes = parse_coordinate_string(node.get(SIZE_KEY))
 
             # Calculate the center of the element
             x = coordinates[0] + sizes[0] // 2
@@ -507,15 +521,11 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         """
         node1 = self.find_element(drag_from_id)
         node2 = self.find_element(drop_on_id)
-        coordinates1 = eval(
-            node1.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-        )
-        sizes1 = eval(node1.get("{{{:}}}size".format(component_ns), "(-1, -1)"))
+        coordinates1 = parse_coordinate_string(node1.get(SCREENCOORD_KEY))
+        sizes1 = parse_coordinate_string(node1.get(SIZE_KEY))
 
-        coordinates2 = eval(
-            node2.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-        )
-        sizes2 = eval(node2.get("{{{:}}}size".format(component_ns), "(-1, -1)"))
+        coordinates2 = parse_coordinate_string(node2.get(SCREENCOORD_KEY))
+        sizes2 = parse_coordinate_string(node2.get(SIZE_KEY))
 
         # Calculate the center of the element
         x1 = coordinates1[0] + sizes1[0] // 2
@@ -550,10 +560,8 @@ subprocess.run(['wmctrl', '-ir', window_id, '-b', 'add,maximized_vert,maximized_
         except:
             node = self.find_element(0)
         # print(node.attrib)
-        coordinates = eval(
-            node.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-        )
-        sizes = eval(node.get("{{{:}}}size".format(component_ns), "(-1, -1)"))
+        coordinates = parse_coordinate_string(node.get(SCREENCOORD_KEY))
+        sizes = parse_coordinate_string(node.get(SIZE_KEY))
 
         # Calculate the center of the element
         x = coordinates[0] + sizes[0] // 2
@@ -124,11 +124,12 @@ def run_agent(agent: UIAgent, instruction: str):
             continue
 
         else:
-            time.sleep(1.0)
             print("EXECUTING CODE:", code[0])
 
             # Ask for permission before executing
             exec(code[0])
+            # The post-exec sleep already lets the UI settle before the next
+            # observation; the pre-exec pause was redundant
             time.sleep(1.0)
 
             # Update task and subtask trajectories and optionally the episodic memory
@@ -162,24 +163,27 @@ def main():
     else:
         raise ValueError("Unsupported platform")
 
+    if "gpt" in args.model:
+        engine_type = "openai"
+    elif "claude" in args.model:
+        engine_type = "anthropic"
+    engine_params = {
+        "engine_type": engine_type,
+        "model": args.model,
+    }
+
+    # Construct the agent once; reloading the knowledge base per query is
+    # wasted work when only the instruction changes
+    agent = GraphSearchAgent(
+        engine_params,
+        grounding_agent,
+        platform=current_platform,
+        action_space="pyautogui",
+        observation_type="mixed",
+    )
+
     while True:
         query = input("Query: ")
-        if "gpt" in args.model:
-            engine_type = "openai"
-        elif "claude" in args.model:
-            engine_type = "anthropic"
-        engine_params = {
-            "engine_type": engine_type,
-            "model": args.model,
-        }
-
-        agent = GraphSearchAgent(
-            engine_params,
-            grounding_agent,
-            platform=current_platform,
-            action_space="pyautogui",
-            observation_type="mixed",
-        )
 
         agent.reset()
 
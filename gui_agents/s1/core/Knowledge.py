@@ -49,6 +49,10 @@ class KnowledgeBase(BaseModule):
             self.local_kb_path, self.platform, "embeddings.pkl"
         )
 
+        # In-memory embeddings cache, loaded from disk once per instance and
+        # reused across retrievals instead of unpickling the file every call
+        self._embeddings = None
+
         self.rag_module_system_prompt = PROCEDURAL_MEMORY.RAG_AGENT.replace(
             "CURRENT_OS", self.platform
         )
@@ -151,13 +155,19 @@ class KnowledgeBase(BaseModule):
 
         return search_results
 
+    def _get_embeddings(self) -> Dict:
+        if self._embeddings is None:
+            self._embeddings = load_embeddings(self.embeddings_path)
+        return self._embeddings
+
     def retrieve_narrative_experience(self, instruction: str) -> Tuple[str, str]:
         """Retrieve narrative experience using embeddings"""
         knowledge_base = load_knowledge_base(self.narrative_memory_path)
         if not knowledge_base:
             return "None", "None"
 
-        embeddings = load_embeddings(self.embeddings_path)
+        embeddings = self._get_embeddings()
+        new_embeddings = False
 
         # Get or create instruction embedding
         instruction_embedding = embeddings.get(instruction)
@@ -165,6 +175,7 @@ class KnowledgeBase(BaseModule):
         if instruction_embedding is None:
             instruction_embedding = self.embedding_engine.get_embeddings(instruction)
             embeddings[instruction] = instruction_embedding
+            new_embeddings = True
 
         # Get or create embeddings for knowledge base entries
         candidate_embeddings = []
@@ -173,10 +184,13 @@ class KnowledgeBase(BaseModule):
             if candidate_embedding is None:
                 candidate_embedding = self.embedding_engine.get_embeddings(key)
                 embeddings[key] = candidate_embedding
+                new_embeddings = True
 
             candidate_embeddings.append(candidate_embedding)
 
-        save_embeddings(self.embeddings_path, embeddings)
+        # Re-pickle the cache only when something new was embedded this call
+        if new_embeddings:
+            save_embeddings(self.embeddings_path, embeddings)
 
         similarities = cosine_similarity(
             instruction_embedding, np.vstack(candidate_embeddings)
@@ -193,7 +207,8 @@ class KnowledgeBase(BaseModule):
         if not knowledge_base:
             return "None", "None"
 
-        embeddings = load_embeddings(self.embeddings_path)
+        embeddings = self._get_embeddings()
+        new_embeddings = False
 
         # Get or create instruction embedding
         instruction_embedding = embeddings.get(instruction)
@@ -201,6 +216,7 @@ class KnowledgeBase(BaseModule):
         if instruction_embedding is None:
             instruction_embedding = self.embedding_engine.get_embeddings(instruction)
             embeddings[instruction] = instruction_embedding
+            new_embeddings = True
 
         # Get or create embeddings for knowledge base entries
         candidate_embeddings = []
@@ -209,10 +225,13 @@ class KnowledgeBase(BaseModule):
             if candidate_embedding is None:
                 candidate_embedding = self.embedding_engine.get_embeddings(key)
                 embeddings[key] = candidate_embedding
+                new_embeddings = True
 
             candidate_embeddings.append(candidate_embedding)
 
-        save_embeddings(self.embeddings_path, embeddings)
+        # Re-pickle the cache only when something new was embedded this call
+        if new_embeddings:
+            save_embeddings(self.embeddings_path, embeddings)
 
         similarities = cosine_similarity(
             instruction_embedding, np.vstack(candidate_embeddings)
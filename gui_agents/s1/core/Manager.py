@@ -249,10 +249,10 @@ class Manager(BaseModule):
             if not visited[node.name]:
                 dfs(node.name, visited, stack)
 
-        # Return the nodes in topologically sorted order
-        sorted_nodes = [
-            next(n for n in dag.nodes if n.name == name) for name in stack[::-1]
-        ]
+        # Return the nodes in topologically sorted order; look nodes up by
+        # name instead of rescanning dag.nodes for every entry
+        node_by_name = {node.name: node for node in dag.nodes}
+        sorted_nodes = [node_by_name[name] for name in stack[::-1]]
         return sorted_nodes
 
     def get_action_queue(
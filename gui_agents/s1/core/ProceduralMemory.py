@@ -1,9 +1,13 @@
 import inspect
 import textwrap
+from functools import lru_cache
 
 
 class PROCEDURAL_MEMORY:
+    # Cached per agent class: the prompt depends only on the class's
+    # decorated actions, and reset() rebuilds it for every subtask
     @staticmethod
+    @lru_cache(maxsize=None)
     def construct_worker_procedural_memory(agent_class):
         procedural_memory = textwrap.dedent(
             f"""\
@@ -155,6 +155,8 @@ class OpenAIEmbeddingEngine(LMMEngine):
         self.display_cost = display_cost
         self.request_interval = 0 if rate_limit == -1 else 60.0 / rate_limit
 
+        self.llm_client = OpenAI(api_key=self.api_key)
+
     @backoff.on_exception(
         backoff.expo,
         (
@@ -164,8 +166,7 @@ class OpenAIEmbeddingEngine(LMMEngine):
         ),
     )
     def get_embeddings(self, text: str) -> np.ndarray:
-        client = OpenAI(api_key=self.api_key)
-        response = client.embeddings.create(model=self.model, input=text)
+        response = self.llm_client.embeddings.create(model=self.model, input=text)
         if self.display_cost:
             total_tokens = response.usage.total_tokens
             cost = self.cost_per_thousand_tokens * total_tokens / 1000
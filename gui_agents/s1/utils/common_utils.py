@@ -1,4 +1,5 @@
 import base64
+import binascii
 import io
 import json
 import os
@@ -7,6 +8,7 @@ import re
 import tempfile
 import time
 import xml.etree.ElementTree as ET
+from functools import lru_cache
 from io import BytesIO
 from typing import Dict, List, Tuple, Union
 from xml.etree.ElementTree import Element
@@ -23,24 +25,43 @@ def find_leaf_nodes(xlm_file_str):
 
     root = ET.fromstring(xlm_file_str)
 
-    # Recursive function to traverse the XML tree and collect leaf nodes
-    def collect_leaf_nodes(node, leaf_nodes):
+    # Traverse the XML tree iteratively with an explicit stack and collect
+    # leaf nodes, avoiding recursion-depth limits on deep trees
+    leaf_nodes = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        children = list(node)
         # If the node has no children, it is a leaf node, add it to the list
-        if not list(node):
+        if not children:
             leaf_nodes.append(node)
-        # If the node has children, recurse on each child
-        for child in node:
-            collect_leaf_nodes(child, leaf_nodes)
-
-    # List to hold all leaf nodes
-    leaf_nodes = []
-    collect_leaf_nodes(root, leaf_nodes)
+        else:
+            # Push in reverse so children are visited in document order
+            stack.extend(reversed(children))
     return leaf_nodes
 
 
 state_ns = "uri:deskat:state.at-spi.gnome.org"
 component_ns = "uri:deskat:component.at-spi.gnome.org"
 
+# Fully-qualified attribute keys, formatted once instead of per node lookup
+_SHOWING_KEY = "{{{:}}}showing".format(state_ns)
+_VISIBLE_KEY = "{{{:}}}visible".format(state_ns)
+_SCREENCOORD_KEY = "{{{:}}}screencoord".format(component_ns)
+_SIZE_KEY = "{{{:}}}size".format(component_ns)
+
+
+def parse_coordinate_string(value) -> Tuple[int, int]:
+    """Parse an AT-SPI "(x, y)" attribute string into an int tuple.
+
+    Replaces eval() on the hot tree-filtering path; missing or malformed
+    values fall back to (-1, -1)."""
+    try:
+        x_str, y_str = value.strip("() ").split(",")
+        return (int(x_str), int(y_str))
+    except (ValueError, AttributeError):
+        return (-1, -1)
+
 
 class Node(BaseModel):
     name: str
@@ -54,6 +75,21 @@ class Dag(BaseModel):
 
 NUM_IMAGE_TOKEN = 1105  # Value set of screen of size 1920x1080 for openai vision
 
+# Non-code commands an agent response may contain
+# fixme: update this when we have more commands
+COMMANDS = ("WAIT", "DONE", "FAIL")
+
+# Patterns compiled once at import time; these run on every model response
+_DAG_JSON_RE = re.compile(r"<json>(.*?)</json>", re.DOTALL)
+_JSON_BLOCK_RE = re.compile(r"```json\s+(.*?)\s+```", re.DOTALL)
+_PLAIN_BLOCK_RE = re.compile(r"```\s+(.*?)\s+```", re.DOTALL)
+_CODE_BLOCK_RE = re.compile(r"```(?:\w+\s+)?(.*?)```", re.DOTALL)
+_CODE_BLOCK_INLINE_RE = re.compile(r"```(?:\w+\s+)?(.*?)```")
+_QUOTED_STRING_RE = re.compile(r'(".*?")', re.DOTALL)
+_AGENT_FUNCTION_RE = re.compile(
+    r'agent\.[a-zA-Z_]+\((?:[^()\'"]|\'[^\']*\'|"[^"]*")*\)'
+)
+
 
 def call_llm_safe(agent) -> Union[str, Dag]:
     # Retry if fails
@@ -80,12 +116,15 @@ def calculate_tokens(messages, num_image_token=NUM_IMAGE_TOKEN) -> Tuple[int, in
 
     input_message = messages[:-1]
 
-    input_string = """"""
+    input_texts = []
     for message in input_message:
-        input_string += message["content"][0]["text"] + "\n"
+        input_texts.append(message["content"][0]["text"])
         if len(message["content"]) > 1:
             num_input_images += 1
 
+    # Join once instead of concatenating strings in the loop
+    input_string = "\n".join(input_texts)
+
     input_text_tokens = get_input_token_length(input_string)
 
     input_image_tokens = num_image_token * num_input_images
@@ -95,57 +134,69 @@ def calculate_tokens(messages, num_image_token=NUM_IMAGE_TOKEN) -> Tuple[int, in
     return (input_text_tokens + input_image_tokens), output_tokens
 
 
+# Tags (and tag suffixes) of nodes worth keeping when filtering the
+# accessibility tree; built once at import time rather than per judge_node call
+_KEEP_TAGS = frozenset(
+    {
+        "alert",
+        "canvas",
+        "check-box",
+        "combo-box",
+        "entry",
+        "icon",
+        "image",
+        "paragraph",
+        "scroll-bar",
+        "section",
+        "slider",
+        "static",
+        "table-cell",
+        "terminal",
+        "text",
+        "netuiribbontab",
+        "start",
+        "trayclockwclass",
+        "traydummysearchcontrol",
+        "uiimage",
+        "uiproperty",
+        "uiribboncommandbar",
+    }
+)
+
+
+# Suffixes matched with a single str.endswith call in judge_node
+_KEEP_TAG_SUFFIXES = (
+    "item",
+    "button",
+    "heading",
+    "label",
+    "scrollbar",
+    "searchbox",
+    "textbox",
+    "link",
+    "tabelement",
+    "textfield",
+    "textarea",
+    "menu",
+    "menu-item",
+)
+
+
 def judge_node(node: Element, platform="ubuntu", check_image=False) -> bool:
     keeps: bool = (
         node.tag.startswith("document")
-        or node.tag.endswith("item")
-        or node.tag.endswith("button")
-        or node.tag.endswith("heading")
-        or node.tag.endswith("label")
-        or node.tag.endswith("scrollbar")
-        or node.tag.endswith("searchbox")
-        or node.tag.endswith("textbox")
-        or node.tag.endswith("link")
-        or node.tag.endswith("tabelement")
-        or node.tag.endswith("textfield")
-        or node.tag.endswith("textarea")
-        or node.tag.endswith("menu")
-        or node.tag.endswith("menu-item")
-        or node.tag
-        in {
-            "alert",
-            "canvas",
-            "check-box",
-            "combo-box",
-            "entry",
-            "icon",
-            "image",
-            "paragraph",
-            "scroll-bar",
-            "section",
-            "slider",
-            "static",
-            "table-cell",
-            "terminal",
-            "text",
-            "netuiribbontab",
-            "start",
-            "trayclockwclass",
-            "traydummysearchcontrol",
-            "uiimage",
-            "uiproperty",
-            "uiribboncommandbar",
-        }
+        or node.tag.endswith(_KEEP_TAG_SUFFIXES)
+        or node.tag in _KEEP_TAGS
     )
 
     keeps = (
         keeps
         and (
             platform == "ubuntu"
-            and node.get("{{{:}}}showing".format(state_ns), "false") == "true"
-            and node.get("{{{:}}}visible".format(state_ns), "false") == "true"
+            and node.get(_SHOWING_KEY, "false") == "true"
+            and node.get(_VISIBLE_KEY, "false") == "true"
             or platform == "windows"
-            and node.get("{{{:}}}visible".format(state_ns), "false") == "true"
+            and node.get(_VISIBLE_KEY, "false") == "true"
         )
         and (
             node.get("name", "") != ""
@@ -161,33 +212,23 @@ def judge_node(node: Element, platform="ubuntu", check_image=False) -> bool:
     #      or node.get("{{{:}}}checkable".format(state_ns), "false") == "true"
     #      ) \
 
-    coordinates: Tuple[int, int] = eval(
-        node.get("{{{:}}}screencoord".format(component_ns), "(-1, -1)")
-    )
-    sizes: Tuple[int, int] = eval(
-        node.get("{{{:}}}size".format(component_ns), "(-1, -1)")
-    )
-    keeps = (
-        keeps
-        and coordinates[0] >= 0
-        and coordinates[1] >= 0
-        and sizes[0] > 0
-        and sizes[1] > 0
+    # Bail out before parsing geometry when the node is already rejected
+    if not keeps:
+        return False
+
+    coordinates: Tuple[int, int] = parse_coordinate_string(node.get(_SCREENCOORD_KEY))
+    sizes: Tuple[int, int] = parse_coordinate_string(node.get(_SIZE_KEY))
+    return (
+        coordinates[0] >= 0 and coordinates[1] >= 0 and sizes[0] > 0 and sizes[1] > 0
     )
-    return keeps
 
 
 def filter_nodes(root: Element, platform="ubuntu", check_image=False):
-    filtered_nodes = []
-    all_nodes = []
-    for node in root.iter():
-        all_nodes.append(node)
-
-    for node in root.iter():
-        if judge_node(node, platform, check_image):
-            filtered_nodes.append(node)
-
-    return filtered_nodes
+    # Single pass over the built-in document-order iterator; no need to
+    # materialize the whole tree first
+    return [
+        node for node in root.iter() if judge_node(node, platform, check_image)
+    ]
 
 
 def draw_bounding_boxes(nodes, image_file_content, down_sampling_ratio=1.0):
@@ -228,10 +269,10 @@ def draw_bounding_boxes(nodes, image_file_content, down_sampling_ratio=1.0):
                 coords = tuple(map(int, coords_str.strip("()").split(", ")))
                 size = tuple(map(int, size_str.strip("()").split(", ")))
 
-                import copy
-
-                original_coords = copy.deepcopy(coords)
-                original_size = copy.deepcopy(size)
+                # Tuples are immutable, so keeping references is enough to
+                # remember the pre-downsampling values
+                original_coords = coords
+                original_size = size
 
                 if float(down_sampling_ratio) != 1.0:
                     # Downsample the coordinates and size
@@ -335,7 +376,9 @@ def print_nodes_with_indent(nodes, indent=0):
 
 
 def encode_image(image_content):
-    return base64.b64encode(image_content).decode("utf-8")
+    # binascii avoids the extra copy base64.b64encode + utf-8 decode makes
+    # on large screenshots
+    return binascii.b2a_base64(image_content, newline=False).decode("ascii")
 
 
 def encoded_img_to_pil_img(data_str):
@@ -360,12 +403,13 @@ def save_to_tmp_img_file(data_str):
 def linearize_accessibility_tree(accessibility_tree, platform="ubuntu", tag=False):
     # leaf_nodes = find_leaf_nodes(accessibility_tree)
     filtered_nodes = filter_nodes(ET.fromstring(accessibility_tree), platform)
-    linearized_accessibility_tree = [
-        "tag\tname\ttext\tposition (top-left x&y)\tsize (w&h)"
-    ]
+    header = "tag\tname\ttext\tposition (top-left x&y)\tsize (w&h)"
+    # Prefix ids while building the lines rather than rewriting every line
+    # in a second pass afterwards
+    linearized_accessibility_tree = ["id\t" + header if tag else header]
     # Linearize the accessibility tree nodes into a table format
 
-    for node in filtered_nodes:
+    for idx, node in enumerate(filtered_nodes, start=1):
         # linearized_accessibility_tree += node.tag + "\t"
         # linearized_accessibility_tree += node.attrib.get('name') + "\t"
         if node.text:
@@ -384,35 +428,20 @@ def linearize_accessibility_tree(accessibility_tree, platform="ubuntu", tag=Fals
         # linearized_accessibility_tree += node.attrib.get(
         # , "") + "\t"
         # linearized_accessibility_tree += node.attrib.get('{uri:deskat:component.at-spi.gnome.org}size', "") + "\n"
-        linearized_accessibility_tree.append(
-            "{:}\t{:}\t{:}\t{:}\t{:}".format(
-                node.tag,
-                node.get("name", ""),
-                text,
-                node.get("{uri:deskat:component.at-spi.gnome.org}screencoord", ""),
-                node.get("{uri:deskat:component.at-spi.gnome.org}size", ""),
-            )
-        )
-    if tag:
-        linearized_accessibility_tree = tag_accessibility_tree(
-            linearized_accessibility_tree
+        line = "{:}\t{:}\t{:}\t{:}\t{:}".format(
+            node.tag,
+            node.get("name", ""),
+            text,
+            node.get("{uri:deskat:component.at-spi.gnome.org}screencoord", ""),
+            node.get("{uri:deskat:component.at-spi.gnome.org}size", ""),
         )
+        if tag:
+            line = f"[{idx}]\t" + line
+        linearized_accessibility_tree.append(line)
 
     return "\n".join(linearized_accessibility_tree)
 
 
-def tag_accessibility_tree(linear_accessibility_tree):
-    # Add 'id' to the first line
-    linear_accessibility_tree[0] = "id\t" + linear_accessibility_tree[0]
-
-    # Start idx from 1 to correctly index into the list
-    for idx in range(1, len(linear_accessibility_tree)):
-        line = linear_accessibility_tree[idx]
-        linear_accessibility_tree[idx] = f"[{str(idx)}]\t" + line
-
-    return linear_accessibility_tree
-
-
 def tag_screenshot(screenshot, accessibility_tree, platform="ubuntu"):
     nodes = filter_nodes(
         ET.fromstring(accessibility_tree), platform=platform, check_image=True
@@ -426,8 +455,7 @@ def tag_screenshot(screenshot, accessibility_tree, platform="ubuntu"):
 
 
 def parse_dag(text):
-    pattern = r"<json>(.*?)</json>"
-    match = re.search(pattern, text, re.DOTALL)
+    match = _DAG_JSON_RE.search(text)
     if match:
         json_str = match.group(1)
         try:
@@ -448,7 +476,7 @@ def parse_dag(text):
 
 
 def parse_subinfo(subinfo_string):
-    matches = re.findall(r"```json\s+(.*?)\s+```", subinfo_string, re.DOTALL)
+    matches = _JSON_BLOCK_RE.findall(subinfo_string)
     if matches:
         # Assuming there's only one match, parse the JSON string into a dictionary
         try:
@@ -468,7 +496,7 @@ def parse_actions_from_string(input_string):
         return [input_string.strip()]
     # Search for a JSON string within the input string
     actions = []
-    matches = re.findall(r"```json\s+(.*?)\s+```", input_string, re.DOTALL)
+    matches = _JSON_BLOCK_RE.findall(input_string)
     if matches:
         # Assuming there's only one match, parse the JSON string into a dictionary
         try:
@@ -479,7 +507,7 @@ def parse_actions_from_string(input_string):
         except json.JSONDecodeError as e:
             return f"Failed to parse JSON: {e}"
     else:
-        matches = re.findall(r"```\s+(.*?)\s+```", input_string, re.DOTALL)
+        matches = _PLAIN_BLOCK_RE.findall(input_string)
         if matches:
             # Assuming there's only one match, parse the JSON string into a dictionary
             try:
@@ -498,8 +526,7 @@ def parse_actions_from_string(input_string):
 
 
 def parse_fixed_action_from_string(input_string):
-    pattern = r"```(?:\w+\s+)?(.*?)```"
-    matches = re.findall(pattern, input_string)
+    matches = _CODE_BLOCK_INLINE_RE.findall(input_string)
     if matches:
         # Assuming there's only one match, parse the JSON string into a dictionary
         try:
@@ -521,9 +548,8 @@ def parse_code_from_string(input_string):
 
     # This regular expression will match both ```code``` and ```python code```
     # and capture the `code` part. It uses a non-greedy match for the content inside.
-    pattern = r"```(?:\w+\s+)?(.*?)```"
     # Find all non-overlapping matches in the string
-    matches = re.findall(pattern, input_string, re.DOTALL)
+    matches = _CODE_BLOCK_RE.findall(input_string)
 
     # The regex above captures the content inside the triple backticks.
     # The `re.DOTALL` flag allows the dot `.` to match newline characters as well,
@@ -535,20 +561,17 @@ def parse_code_from_string(input_string):
 
     for match in matches:
         match = match.strip()
-        commands = [
-            "WAIT",
-            "DONE",
-            "FAIL",
-        ]  # fixme: updates this part when we have more commands
-
-        if match in commands:
+        if match in COMMANDS:
             codes.append(match.strip())
-        elif match.split("\n")[-1] in commands:
-            if len(match.split("\n")) > 1:
-                codes.append("\n".join(match.split("\n")[:-1]))
-            codes.append(match.split("\n")[-1])
         else:
-            codes.append(match)
+            # Split once and reuse instead of re-splitting per branch
+            lines = match.split("\n")
+            if lines[-1] in COMMANDS:
+                if len(lines) > 1:
+                    codes.append("\n".join(lines[:-1]))
+                codes.append(lines[-1])
+            else:
+                codes.append(match)
 
     return codes
 
@@ -560,9 +583,8 @@ def parse_single_code_from_string(input_string):
 
     # This regular expression will match both ```code``` and ```python code```
     # and capture the `code` part. It uses a non-greedy match for the content inside.
-    pattern = r"```(?:\w+\s+)?(.*?)```"
     # Find all non-overlapping matches in the string
-    matches = re.findall(pattern, input_string, re.DOTALL)
+    matches = _CODE_BLOCK_RE.findall(input_string)
 
     # The regex above captures the content inside the triple backticks.
     # The `re.DOTALL` flag allows the dot `.` to match newline characters as well,
@@ -574,28 +596,23 @@ def parse_single_code_from_string(input_string):
 
     for match in matches:
         match = match.strip()
-        commands = [
-            "WAIT",
-            "DONE",
-            "FAIL",
-        ]  # fixme: updates this part when we have more commands
-
-        if match in commands:
+        if match in COMMANDS:
             codes.append(match.strip())
-        elif match.split("\n")[-1] in commands:
-            if len(match.split("\n")) > 1:
-                codes.append("\n".join(match.split("\n")[:-1]))
-            codes.append(match.split("\n")[-1])
         else:
-            codes.append(match)
+            # Split once and reuse instead of re-splitting per branch
+            lines = match.split("\n")
+            if lines[-1] in COMMANDS:
+                if len(lines) > 1:
+                    codes.append("\n".join(lines[:-1]))
+                codes.append(lines[-1])
+            else:
+                codes.append(match)
 
     return codes[0]
 
 
 def parse_action_from_fixed_code(action_string, linearized_accessibility_tree):
 
-    import re
-
     def parse_action_from_agent_code(action_str):
         # First, extract the code block within triple backticks
         code_block_pattern = r"```(.*?)```"
@@ -632,7 +649,6 @@ def parse_action_from_fixed_code(action_string, linearized_accessibility_tree):
 
     parsed_action = parse_action_from_agent_code(action_string)
     action_type, params = parsed_action
-    code = ""
 
     def get_position_from_tree(element_id):
         element = linearized_accessibility_tree[element_id]
@@ -646,48 +662,41 @@ def parse_action_from_fixed_code(action_string, linearized_accessibility_tree):
         centroid_x, centroid_y = top_x + size_x // 2, top_y + size_y // 2
         return centroid_x, centroid_y
 
-    if action_type == "left_click_element_by_id":
-        element_id = int(params[0])
-        centroid_x, centroid_y = get_position_from_tree(element_id)
-        code = f"""position = ({centroid_x}, {centroid_y}); pyautogui.click(position)
-        """
-
-    elif action_type == "right_click_element_by_id":
-        element_id = int(params[0])
-        centroid_x, centroid_y = get_position_from_tree(element_id)
-        code = f"""
-        position = ({centroid_x}, {centroid_y}); pyautogui.click(position, button='right')
-        """
-
-    elif action_type == "hover_over_element_by_id":
-        element_id = int(params[0])
-        centroid_x, centroid_y = get_position_from_tree(element_id)
-        code = (
-            f"""position = ({centroid_x}, {centroid_y}); pyautogui.moveTo(position)"""
-        )
-
-    elif action_type == "type_write_element_by_id":
-        element_id = int(params[0])
-        text = params[1]
-        centroid_x, centroid_y = get_position_from_tree(element_id)
-        code = f"""
-        position = ({centroid_x}, {centroid_y}); pyautogui.click(position); time.sleep(0.75); pyautogui.typewrite("{text}")"""
-
-    elif action_type == "press_key_combinations":
-        keys = params
-        keys_str = '", "'.join(keys)
-        code = f"""
-        pyautogui.hotkey("{keys_str}")
-        """
+    def left_click_element_by_id(params):
+        centroid_x, centroid_y = get_position_from_tree(int(params[0]))
+        return f"position = ({centroid_x}, {centroid_y}); pyautogui.click(position)"
 
-    elif action_type == "wait":
-        code = """WAIT"""
+    def right_click_element_by_id(params):
+        centroid_x, centroid_y = get_position_from_tree(int(params[0]))
+        return f"position = ({centroid_x}, {centroid_y}); pyautogui.click(position, button='right')"
 
-    elif action_type == "done":
-        code = """DONE"""
+    def hover_over_element_by_id(params):
+        centroid_x, centroid_y = get_position_from_tree(int(params[0]))
+        return f"position = ({centroid_x}, {centroid_y}); pyautogui.moveTo(position)"
 
-    elif action_type == "fail":
-        code = "FAIL"
+    def type_write_element_by_id(params):
+        centroid_x, centroid_y = get_position_from_tree(int(params[0]))
+        text = params[1]
+        return f'position = ({centroid_x}, {centroid_y}); pyautogui.click(position); time.sleep(0.75); pyautogui.typewrite("{text}")'
+
+    def press_key_combinations(params):
+        keys_str = '", "'.join(params)
+        return f'pyautogui.hotkey("{keys_str}")'
+
+    # Dispatch on the action type instead of walking an if/elif ladder
+    handlers = {
+        "left_click_element_by_id": left_click_element_by_id,
+        "right_click_element_by_id": right_click_element_by_id,
+        "hover_over_element_by_id": hover_over_element_by_id,
+        "type_write_element_by_id": type_write_element_by_id,
+        "press_key_combinations": press_key_combinations,
+        "wait": lambda params: "WAIT",
+        "done": lambda params: "DONE",
+        "fail": lambda params: "FAIL",
+    }
+
+    handler = handlers.get(action_type)
+    code = handler(params) if handler else ""
 
     return [code.strip()]
 
@@ -784,8 +793,14 @@ def text_cvt_orc_format_paddle(paddle_result):
     return texts
 
 
+@lru_cache(maxsize=None)
+def _get_encoder(model: str = "gpt-4"):
+    # Loading a tiktoken encoding is expensive; cache it per model
+    return tiktoken.encoding_for_model(model)
+
+
 def trim_accessibility_tree(linearized_accessibility_tree, max_tokens):
-    enc = tiktoken.encoding_for_model("gpt-4")
+    enc = _get_encoder()
     tokens = enc.encode(linearized_accessibility_tree)
     if len(tokens) > max_tokens:
         print("MAX TOKEN LENGTH OF ACCESSIBILITY TREE EXCEEDED")
@@ -795,7 +810,7 @@ def trim_accessibility_tree(linearized_accessibility_tree, max_tokens):
 
 
 def get_input_token_length(input_string):
-    enc = tiktoken.encoding_for_model("gpt-4")
+    enc = _get_encoder()
     tokens = enc.encode(input_string)
     return len(tokens)
 
@@ -816,9 +831,8 @@ def load_osworld_example(base_path: str, domain: str, id: int):
 def sanitize_code(code):
     # This pattern captures the outermost double-quoted text
     if "\n" in code:
-        pattern = r'(".*?")'
         # Find all matches in the text
-        matches = re.findall(pattern, code, flags=re.DOTALL)
+        matches = _QUOTED_STRING_RE.findall(code)
         if matches:
             # Replace the first occurrence only
             first_match = matches[0]
@@ -828,10 +842,8 @@ def sanitize_code(code):
 
 def extract_first_agent_function(code_string):
     # Regular expression pattern to match 'agent' functions with any arguments, including nested parentheses
-    pattern = r'agent\.[a-zA-Z_]+\((?:[^()\'"]|\'[^\']*\'|"[^"]*")*\)'
-
     # Find all matches in the string
-    matches = re.findall(pattern, code_string)
+    matches = _AGENT_FUNCTION_RE.findall(code_string)
 
     # Return the first match if found, otherwise return None
     return matches[0] if matches else None
@@ -1,6 +1,6 @@
 import base64
-import gc
 import io
+from threading import Lock
 
 import numpy as np
 from fastapi import FastAPI
@@ -10,6 +10,9 @@ from pydantic import BaseModel
 
 app = FastAPI()
 ocr_module = PaddleOCR(use_angle_cls=True, lang="en")
+# Paddle predictors are not thread-safe; serialize access across the
+# threadpool workers that run the sync endpoint
+ocr_lock = Lock()
 
 
 class ImageData(BaseModel):
@@ -41,14 +44,12 @@ def ocr_results(screenshot):
 
 
 @app.post("/ocr/")
-async def read_image(image_data: ImageData):
+def read_image(image_data: ImageData):
+    # Sync endpoint: FastAPI runs it in the threadpool, so the blocking OCR
+    # call no longer stalls the event loop
     image_bytes = base64.b64decode(image_data.img_bytes)
-    results = ocr_results(image_bytes)
-
-    # Explicitly delete unused variables and run garbage collector
-    del image_bytes
-    gc.collect()
-
+    with ocr_lock:
+        results = ocr_results(image_bytes)
     return {"results": results}
 
 
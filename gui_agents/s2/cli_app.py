@@ -122,11 +122,12 @@ def run_agent(agent, instruction: str, scaled_width: int, scaled_height: int):
             continue
 
         else:
-            time.sleep(1.0)
             print("EXECUTING CODE:", code[0])
 
             # Ask for permission before executing
             exec(code[0])
+            # The post-exec sleep already lets the UI settle before the next
+            # observation; the pre-exec pause was redundant
             time.sleep(1.0)
 
             # Update task and subtask trajectories and optionally the episodic memory
@@ -44,6 +44,10 @@ class KnowledgeBase(BaseModule):
             self.local_kb_path, self.platform, "embeddings.pkl"
         )
 
+        # In-memory embeddings cache, loaded from disk once per instance and
+        # reused across retrievals instead of unpickling the file every call
+        self._embeddings = None
+
         # Initialize trajectory tracking
         self.task_trajectory = ""
         self.current_subtask_trajectory = ""
@@ -159,6 +163,11 @@ class KnowledgeBase(BaseModule):
 
         return search_results
 
+    def _get_embeddings(self) -> Dict:
+        if self._embeddings is None:
+            self._embeddings = load_embeddings(self.embeddings_path)
+        return self._embeddings
+
     def retrieve_narrative_experience(self, instruction: str) -> Tuple[str, str]:
         """Retrieve narrative experience using embeddings"""
 
@@ -166,7 +175,8 @@ class KnowledgeBase(BaseModule):
         if not knowledge_base:
             return "None", "None"
 
-        embeddings = load_embeddings(self.embeddings_path)
+        embeddings = self._get_embeddings()
+        new_embeddings = False
 
         # Get or create instruction embedding
         instruction_embedding = embeddings.get(instruction)
@@ -174,6 +184,7 @@ class KnowledgeBase(BaseModule):
         if instruction_embedding is None:
             instruction_embedding = self.embedding_engine.get_embeddings(instruction)
             embeddings[instruction] = instruction_embedding
+            new_embeddings = True
 
         # Get or create embeddings for knowledge base entries
         candidate_embeddings = []
@@ -182,10 +193,13 @@ class KnowledgeBase(BaseModule):
             if candidate_embedding is None:
                 candidate_embedding = self.embedding_engine.get_embeddings(key)
                 embeddings[key] = candidate_embedding
+                new_embeddings = True
 
             candidate_embeddings.append(candidate_embedding)
 
-        save_embeddings(self.embeddings_path, embeddings)
+        # Re-pickle the cache only when something new was embedded this call
+        if new_embeddings:
+            save_embeddings(self.embeddings_path, embeddings)
 
         similarities = cosine_similarity(
             instruction_embedding, np.vstack(candidate_embeddings)
@@ -203,7 +217,8 @@ class KnowledgeBase(BaseModule):
         if not knowledge_base:
             return "None", "None"
 
-        embeddings = load_embeddings(self.embeddings_path)
+        embeddings = self._get_embeddings()
+        new_embeddings = False
 
         # Get or create instruction embedding
         instruction_embedding = embeddings.get(instruction)
@@ -211,6 +226,7 @@ class KnowledgeBase(BaseModule):
         if instruction_embedding is None:
             instruction_embedding = self.embedding_engine.get_embeddings(instruction)
             embeddings[instruction] = instruction_embedding
+            new_embeddings = True
 
         # Get or create embeddings for knowledge base entries
         candidate_embeddings = []
@@ -219,10 +235,13 @@ class KnowledgeBase(BaseModule):
             if candidate_embedding is None:
                 candidate_embedding = self.embedding_engine.get_embeddings(key)
                 embeddings[key] = candidate_embedding
+                new_embeddings = True
 
             candidate_embeddings.append(candidate_embedding)
 
-        save_embeddings(self.embeddings_path, embeddings)
+        # Re-pickle the cache only when something new was embedded this call
+        if new_embeddings:
+            save_embeddings(self.embeddings_path, embeddings)
 
         similarities = cosine_similarity(
             instruction_embedding, np.vstack(candidate_embeddings)
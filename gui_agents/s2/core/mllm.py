@@ -1,4 +1,5 @@
 import base64
+import binascii
 
 import numpy as np
 
@@ -50,9 +51,9 @@ class LMMAgent:
         # if image_content is a path to an image file, check type of the image_content to verify
         if isinstance(image_content, str):
             with open(image_content, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode("utf-8")
+                return binascii.b2a_base64(image_file.read(), newline=False).decode("ascii")
         else:
-            return base64.b64encode(image_content).decode("utf-8")
+            return binascii.b2a_base64(image_content, newline=False).decode("ascii")
 
     def reset(
         self,
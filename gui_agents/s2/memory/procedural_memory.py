@@ -1,11 +1,22 @@
 import inspect
 import textwrap
+from functools import lru_cache
 
 
 class PROCEDURAL_MEMORY:
 
     @staticmethod
     def construct_worker_procedural_memory(agent_class, skipped_actions):
+        # The prompt depends only on the class's decorated actions, and
+        # reset() rebuilds it for every subtask; cache by class and the
+        # (hashable) skipped-action tuple
+        return PROCEDURAL_MEMORY._construct_worker_procedural_memory(
+            agent_class, tuple(skipped_actions)
+        )
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _construct_worker_procedural_memory(agent_class, skipped_actions):
         procedural_memory = textwrap.dedent(
             f"""\
         You are an expert in graphical user interfaces and Python code. You are responsible for executing the current subtask: `SUBTASK_DESCRIPTION` of the larger goal: `TASK_DESCRIPTION`.
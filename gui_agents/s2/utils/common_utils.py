@@ -3,6 +3,7 @@ import re
 from typing import List
 import time
 import tiktoken
+from functools import lru_cache
 
 from typing import Tuple, List, Union, Dict
 
@@ -23,6 +24,18 @@ class Dag(BaseModel):
 
 NUM_IMAGE_TOKEN = 1105  # Value set of screen of size 1920x1080 for openai vision
 
+# Non-code commands an agent response may contain
+# fixme: update this when we have more commands
+COMMANDS = ("WAIT", "DONE", "FAIL")
+
+# Patterns compiled once at import time; these run on every model response
+_DAG_JSON_RE = re.compile(r"<json>(.*?)</json>", re.DOTALL)
+_CODE_BLOCK_RE = re.compile(r"```(?:\w+\s+)?(.*?)```", re.DOTALL)
+_QUOTED_STRING_RE = re.compile(r'(".*?")', re.DOTALL)
+_AGENT_FUNCTION_RE = re.compile(
+    r'agent\.[a-zA-Z_]+\((?:[^()\'"]|\'[^\']*\'|"[^"]*")*\)'
+)
+
 
 def call_llm_safe(agent) -> Union[str, Dag]:
     # Retry if fails
@@ -49,12 +62,15 @@ def calculate_tokens(messages, num_image_token=NUM_IMAGE_TOKEN) -> Tuple[int, in
 
     input_message = messages[:-1]
 
-    input_string = """"""
+    input_texts = []
     for message in input_message:
-        input_string += message["content"][0]["text"] + "\n"
+        input_texts.append(message["content"][0]["text"])
         if len(message["content"]) > 1:
             num_input_images += 1
 
+    # Join once instead of concatenating strings in the loop
+    input_string = "\n".join(input_texts)
+
     input_text_tokens = get_input_token_length(input_string)
 
     input_image_tokens = num_image_token * num_input_images
@@ -68,8 +84,7 @@ def calculate_tokens(messages, num_image_token=NUM_IMAGE_TOKEN) -> Tuple[int, in
 
 
 def parse_dag(text):
-    pattern = r"<json>(.*?)</json>"
-    match = re.search(pattern, text, re.DOTALL)
+    match = _DAG_JSON_RE.search(text)
     if match:
         json_str = match.group(1)
         try:
@@ -96,9 +111,8 @@ def parse_single_code_from_string(input_string):
 
     # This regular expression will match both ```code``` and ```python code```
     # and capture the `code` part. It uses a non-greedy match for the content inside.
-    pattern = r"```(?:\w+\s+)?(.*?)```"
     # Find all non-overlapping matches in the string
-    matches = re.findall(pattern, input_string, re.DOTALL)
+    matches = _CODE_BLOCK_RE.findall(input_string)
 
     # The regex above captures the content inside the triple backticks.
     # The `re.DOTALL` flag allows the dot `.` to match newline characters as well,
@@ -110,28 +124,31 @@ def parse_single_code_from_string(input_string):
 
     for match in matches:
         match = match.strip()
-        commands = [
-            "WAIT",
-            "DONE",
-            "FAIL",
-        ]  # fixme: updates this part when we have more commands
-
-        if match in commands:
+        if match in COMMANDS:
             codes.append(match.strip())
-        elif match.split("\n")[-1] in commands:
-            if len(match.split("\n")) > 1:
-                codes.append("\n".join(match.split("\n")[:-1]))
-            codes.append(match.split("\n")[-1])
         else:
-            codes.append(match)
+            # Split once and reuse instead of re-splitting per branch
+            lines = match.split("\n")
+            if lines[-1] in COMMANDS:
+                if len(lines) > 1:
+                    codes.append("\n".join(lines[:-1]))
+                codes.append(lines[-1])
+            else:
+                codes.append(match)
 
     if len(codes) <= 0:
         return "fail"
     return codes[0]
 
 
+@lru_cache(maxsize=None)
+def _get_encoder(model: str = "gpt-4"):
+    # Loading a tiktoken encoding is expensive; cache it per model
+    return tiktoken.encoding_for_model(model)
+
+
 def get_input_token_length(input_string):
-    enc = tiktoken.encoding_for_model("gpt-4")
+    enc = _get_encoder()
     tokens = enc.encode(input_string)
     return len(tokens)
 
@@ -139,9 +156,8 @@ def get_input_token_length(input_string):
 def sanitize_code(code):
     # This pattern captures the outermost double-quoted text
     if "\n" in code:
-        pattern = r'(".*?")'
         # Find all matches in the text
-        matches = re.findall(pattern, code, flags=re.DOTALL)
+        matches = _QUOTED_STRING_RE.findall(code)
         if matches:
             # Replace the first occurrence only
             first_match = matches[0]
@@ -151,10 +167,8 @@ def sanitize_code(code):
 
 def extract_first_agent_function(code_string):
     # Regular expression pattern to match 'agent' functions with any arguments, including nested parentheses
-    pattern = r'agent\.[a-zA-Z_]+\((?:[^()\'"]|\'[^\']*\'|"[^"]*")*\)'
-
     # Find all matches in the string
-    matches = re.findall(pattern, code_string)
+    matches = _AGENT_FUNCTION_RE.findall(code_string)
 
     # Return the first match if found, otherwise return None
     return matches[0] if matches else None
@@ -10,6 +10,8 @@ import json
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
 
 from gui_agents.s1.core.AgentS import GraphSearchAgent
 from gui_agents.s1.aci.LinuxOSACI import LinuxACI
@@ -20,44 +22,60 @@ from desktop_env.desktop_env import DesktopEnv
 
 # import wandb
 
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+except ImportError:  # orjson is optional; the stdlib json works everywhere
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 
 #  Logger Configs {{{ #
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)
 
 datetime_str: str = datetime.datetime.now().strftime("%Y%m%d@%H%M%S")
 
+# Debug file logging is opt-in: with the root logger at INFO, DEBUG records
+# are discarded before any handler formats them
+debug_log = bool(os.getenv("AGENT_DEBUG_LOG"))
+logger.setLevel(logging.DEBUG if debug_log else logging.INFO)
+
 file_handler = logging.FileHandler(
     os.path.join("logs", "normal-{:}.log".format(datetime_str)), encoding="utf-8"
 )
-debug_handler = logging.FileHandler(
-    os.path.join("logs", "debug-{:}.log".format(datetime_str)), encoding="utf-8"
-)
 stdout_handler = logging.StreamHandler(sys.stdout)
-sdebug_handler = logging.FileHandler(
-    os.path.join("logs", "sdebug-{:}.log".format(datetime_str)), encoding="utf-8"
-)
 
 file_handler.setLevel(logging.INFO)
-debug_handler.setLevel(logging.DEBUG)
 stdout_handler.setLevel(logging.INFO)
-sdebug_handler.setLevel(logging.DEBUG)
 
-formatter = logging.Formatter(
+# ANSI colors only help on the terminal; file handlers get a plain formatter
+plain_formatter = logging.Formatter(
+    fmt="[%(asctime)s %(levelname)s %(module)s/%(lineno)d-%(processName)s] %(message)s"
+)
+color_formatter = logging.Formatter(
     fmt="\x1b[1;33m[%(asctime)s \x1b[31m%(levelname)s \x1b[32m%(module)s/%(lineno)d-%(processName)s\x1b[1;33m] \x1b[0m%(message)s"
 )
-file_handler.setFormatter(formatter)
-debug_handler.setFormatter(formatter)
-stdout_handler.setFormatter(formatter)
-sdebug_handler.setFormatter(formatter)
+file_handler.setFormatter(plain_formatter)
+stdout_handler.setFormatter(color_formatter)
 
 stdout_handler.addFilter(logging.Filter("desktopenv"))
-sdebug_handler.addFilter(logging.Filter("desktopenv"))
 
 logger.addHandler(file_handler)
-logger.addHandler(debug_handler)
 logger.addHandler(stdout_handler)
-logger.addHandler(sdebug_handler)
+
+if debug_log:
+    debug_handler = logging.FileHandler(
+        os.path.join("logs", "debug-{:}.log".format(datetime_str)), encoding="utf-8"
+    )
+    debug_handler.setLevel(logging.DEBUG)
+    debug_handler.setFormatter(plain_formatter)
+    logger.addHandler(debug_handler)
 #  }}} Logger Configs #
 
 logger = logging.getLogger("desktopenv.experiment")
@@ -108,6 +126,23 @@ def config() -> argparse.Namespace:
 
     # logging related
     parser.add_argument("--result_dir", type=str, default="./results")
+    parser.add_argument(
+        "--no-cleanup",
+        dest="cleanup",
+        action="store_false",
+        help="Keep partial outputs of unfinished examples instead of removing them during the startup scan",
+    )
+    parser.add_argument(
+        "--interleave_domains",
+        action="store_true",
+        help="Visit examples round-robin across domains instead of one domain at a time",
+    )
+    parser.add_argument(
+        "--env_recycle_every",
+        type=int,
+        default=0,
+        help="Recreate the DesktopEnv every N examples to bound memory growth (0 disables)",
+    )
 
     # NEW!
     parser.add_argument("--huggingface_endpoint_url", type=str, required=True)
@@ -118,6 +153,31 @@ def config() -> argparse.Namespace:
     return args
 
 
+def _load_example_config(config_file: str) -> dict:
+    with open(config_file, "r", encoding="utf-8") as f:
+        return _json_loads(f.read())
+
+
+def flatten_examples(test_all_meta: dict, interleave: bool = False) -> list:
+    """Flatten {domain: [example_id, ...]} into (domain, example_id) pairs.
+
+    With interleave=True examples are taken round-robin across domains, so
+    slow domains do not cluster at one end of the run."""
+    if not interleave:
+        return [
+            (domain, example_id)
+            for domain in test_all_meta
+            for example_id in test_all_meta[domain]
+        ]
+    rows = zip_longest(
+        *(
+            [(domain, example_id) for example_id in examples]
+            for domain, examples in test_all_meta.items()
+        )
+    )
+    return [pair for row in rows for pair in row if pair is not None]
+
+
 def test(args: argparse.Namespace, test_all_meta: dict) -> None:
     scores = []
     max_steps = args.max_steps
@@ -144,12 +204,9 @@ def test(args: argparse.Namespace, test_all_meta: dict) -> None:
     }
 
     # NEW!
-    if args.model.startswith("claude"):
-        engine_type = "anthropic"
-    elif args.model.startswith("gpt"):
-        engine_type = "openai"
-    else:
-        engine_type = "vllm"
+    engine_type = {"claude": "anthropic", "gpt": "openai"}.get(
+        args.model.split("-")[0], "vllm"
+    )
 
     engine_params = {"engine_type": engine_type, "model": args.model}
 
@@ -169,145 +226,140 @@ def test(args: argparse.Namespace, test_all_meta: dict) -> None:
         kb_release_tag="v0.2.2",
     )
 
-    env = DesktopEnv(
-        path_to_vm=args.path_to_vm,
-        action_space=agent.action_space,
-        screen_size=(args.screen_width, args.screen_height),
-        headless=args.headless,
-        os_type="Ubuntu",
-        require_a11y_tree=args.observation_type
-        in ["a11y_tree", "screenshot_a11y_tree", "som"],
+    def make_env() -> DesktopEnv:
+        return DesktopEnv(
+            path_to_vm=args.path_to_vm,
+            action_space=agent.action_space,
+            screen_size=(args.screen_width, args.screen_height),
+            headless=args.headless,
+            os_type="Ubuntu",
+            require_a11y_tree=args.observation_type
+            in ["a11y_tree", "screenshot_a11y_tree", "som"],
+        )
+
+    env = make_env()
+    examples_since_recycle = 0
+
+    examples = flatten_examples(test_all_meta, interleave=args.interleave_domains)
+    config_files = [
+        os.path.join(args.test_config_base_dir, f"examples/{domain}/{example_id}.json")
+        for domain, example_id in examples
+    ]
+
+    # Prefetch the next config while the current example runs, so the file
+    # IO hides behind the multi-second example execution
+    prefetcher = ThreadPoolExecutor(max_workers=2)
+    next_config = (
+        prefetcher.submit(_load_example_config, config_files[0])
+        if config_files
+        else None
     )
 
-    for domain in tqdm(test_all_meta, desc="Domain"):
-        for example_id in tqdm(test_all_meta[domain], desc="Example", leave=False):
-            config_file = os.path.join(
-                args.test_config_base_dir, f"examples/{domain}/{example_id}.json"
-            )
-            with open(config_file, "r", encoding="utf-8") as f:
-                example = json.load(f)
-
-            logger.info(f"[Domain]: {domain}")
-            logger.info(f"[Example ID]: {example_id}")
-
-            instruction = example["instruction"]
-
-            logger.info(f"[Instruction]: {instruction}")
-            # wandb each example config settings
-            cfg_args["instruction"] = instruction
-            cfg_args["start_time"] = datetime.datetime.now().strftime(
-                "%Y:%m:%d-%H:%M:%S"
+    for idx, (domain, example_id) in enumerate(tqdm(examples, desc="Example")):
+        example = next_config.result()
+        if idx + 1 < len(config_files):
+            next_config = prefetcher.submit(_load_example_config, config_files[idx + 1])
+
+        logger.info(f"[Domain]: {domain}")
+        logger.info(f"[Example ID]: {example_id}")
+
+        instruction = example["instruction"]
+
+        logger.info(f"[Instruction]: {instruction}")
+        # wandb each example config settings
+        cfg_args["instruction"] = instruction
+        cfg_args["start_time"] = datetime.datetime.now().strftime(
+            "%Y:%m:%d-%H:%M:%S"
+        )
+        # run.config.update(cfg_args)
+
+        example_result_dir = os.path.join(
+            args.result_dir,
+            args.action_space,
+            args.observation_type,
+            args.model,
+            domain,
+            example_id,
+        )
+        os.makedirs(example_result_dir, exist_ok=True)
+        # example start running
+        try:
+            lib_run_single.run_single_example(
+                agent,
+                env,
+                example,
+                max_steps,
+                instruction,
+                args,
+                example_result_dir,
+                scores,
             )
-            # run.config.update(cfg_args)
-
-            example_result_dir = os.path.join(
-                args.result_dir,
-                args.action_space,
-                args.observation_type,
-                args.model,
-                domain,
-                example_id,
+        except Exception as e:
+            logger.error(f"Exception in {domain}/{example_id}: {e}")
+            env.controller.end_recording(
+                os.path.join(example_result_dir, "recording.mp4")
             )
-            os.makedirs(example_result_dir, exist_ok=True)
-            # example start running
-            try:
-                lib_run_single.run_single_example(
-                    agent,
-                    env,
-                    example,
-                    max_steps,
-                    instruction,
-                    args,
-                    example_result_dir,
-                    scores,
-                )
-            except Exception as e:
-                logger.error(f"Exception in {domain}/{example_id}: {e}")
-                env.controller.end_recording(
-                    os.path.join(example_result_dir, "recording.mp4")
-                )
-                with open(os.path.join(example_result_dir, "traj.jsonl"), "a") as f:
-                    f.write(
-                        json.dumps(
-                            {"Error": f"Time limit exceeded in {domain}/{example_id}"}
-                        )
+            with open(os.path.join(example_result_dir, "traj.jsonl"), "a") as f:
+                f.write(
+                    _json_dumps(
+                        {"Error": f"Time limit exceeded in {domain}/{example_id}"}
                     )
-                    f.write("\n")
+                )
+                f.write("\n")
+
+        # Long runs accumulate memory inside the environment; tearing it
+        # down every N examples keeps the footprint bounded
+        examples_since_recycle += 1
+        if (
+            args.env_recycle_every
+            and examples_since_recycle >= args.env_recycle_every
+        ):
+            logger.info(
+                "Recycling environment after %d examples", examples_since_recycle
+            )
+            env.close()
+            env = make_env()
+            examples_since_recycle = 0
 
+    prefetcher.shutdown(wait=False)
     env.close()
     logger.info(f"Average score: {sum(scores) / len(scores)}")
 
 
-def get_unfinished(
-    action_space, use_model, observation_type, result_dir, total_file_json
-):
-    target_dir = os.path.join(result_dir, action_space, observation_type, use_model)
-
-    if not os.path.exists(target_dir):
-        return total_file_json
+def scan_results(target_dir, cleanup=False):
+    """Single scandir pass over the result tree.
 
+    Returns (finished_by_domain, scores). With cleanup=True, examples that
+    have no result.txt get their partial outputs removed."""
     finished = {}
-    for domain in os.listdir(target_dir):
-        finished[domain] = []
-        domain_path = os.path.join(target_dir, domain)
-        if os.path.isdir(domain_path):
-            for example_id in os.listdir(domain_path):
-                if example_id == "onboard":
-                    continue
-                example_path = os.path.join(domain_path, example_id)
-                if os.path.isdir(example_path):
-                    if "result.txt" not in os.listdir(example_path):
-                        # empty all files under example_id
-                        for file in os.listdir(example_path):
-                            os.remove(os.path.join(example_path, file))
-                    else:
-                        finished[domain].append(example_id)
-
-    if not finished:
-        return total_file_json
-
-    for domain, examples in finished.items():
-        if domain in total_file_json:
-            total_file_json[domain] = [
-                x for x in total_file_json[domain] if x not in examples
-            ]
-
-    return total_file_json
-
-
-def get_result(action_space, use_model, observation_type, result_dir, total_file_json):
-    target_dir = os.path.join(result_dir, action_space, observation_type, use_model)
+    scores = []
     if not os.path.exists(target_dir):
-        print("New experiment, no result yet.")
-        return None
-
-    all_result = []
-
-    for domain in os.listdir(target_dir):
-        domain_path = os.path.join(target_dir, domain)
-        if os.path.isdir(domain_path):
-            for example_id in os.listdir(domain_path):
-                example_path = os.path.join(domain_path, example_id)
-                if os.path.isdir(example_path):
-                    if "result.txt" in os.listdir(example_path):
-                        # empty all files under example_id
-                        try:
-                            all_result.append(
-                                float(
-                                    open(
-                                        os.path.join(example_path, "result.txt"), "r"
-                                    ).read()
-                                )
-                            )
-                        except:
-                            all_result.append(0.0)
-
-    if not all_result:
-        print("New experiment, no result yet.")
-        return None
-    else:
-        print("Current Success Rate:", sum(all_result) / len(all_result) * 100, "%")
-        return all_result
+        return finished, scores
+
+    with os.scandir(target_dir) as domains:
+        for domain_entry in domains:
+            if not domain_entry.is_dir():
+                continue
+            finished[domain_entry.name] = []
+            with os.scandir(domain_entry.path) as examples:
+                for example_entry in examples:
+                    if example_entry.name == "onboard" or not example_entry.is_dir():
+                        continue
+                    result_path = os.path.join(example_entry.path, "result.txt")
+                    try:
+                        with open(result_path, "r") as f:
+                            scores.append(float(f.read()))
+                    except FileNotFoundError:
+                        if cleanup:
+                            # empty all files under example_id
+                            for file in os.listdir(example_entry.path):
+                                os.remove(os.path.join(example_entry.path, file))
+                        continue
+                    except Exception:
+                        scores.append(0.0)
+                    finished[domain_entry.name].append(example_entry.name)
+
+    return finished, scores
 
 
 if __name__ == "__main__":
@@ -316,28 +368,31 @@ if __name__ == "__main__":
     args = config()
 
     with open(args.test_all_meta_path, "r", encoding="utf-8") as f:
-        test_all_meta = json.load(f)
+        test_all_meta = _json_loads(f.read())
 
     if args.domain != "all":
         test_all_meta = {args.domain: test_all_meta[args.domain]}
 
-    test_file_list = get_unfinished(
-        args.action_space,
-        args.model,
-        args.observation_type,
-        args.result_dir,
-        test_all_meta,
+    target_dir = os.path.join(
+        args.result_dir, args.action_space, args.observation_type, args.model
     )
+    # One pass over the result tree yields both the finished set and the scores
+    finished, scores = scan_results(target_dir, cleanup=args.cleanup)
+    for domain, examples in finished.items():
+        if domain in test_all_meta:
+            finished_set = set(examples)
+            test_all_meta[domain] = [
+                x for x in test_all_meta[domain] if x not in finished_set
+            ]
+
+    test_file_list = test_all_meta
     left_info = ""
     for domain in test_file_list:
         left_info += f"{domain}: {len(test_file_list[domain])}\n"
     logger.info(f"Left tasks:\n{left_info}")
 
-    get_result(
-        args.action_space,
-        args.model,
-        args.observation_type,
-        args.result_dir,
-        test_all_meta,
-    )
+    if scores:
+        print("Current Success Rate:", sum(scores) / len(scores) * 100, "%")
+    else:
+        print("New experiment, no result yet.")
     test(args, test_file_list)
@@ -5,6 +5,19 @@ import os
 import time
 from wrapt_timeout_decorator import *
 
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+except ImportError:  # orjson is optional; the stdlib json works everywhere
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 logger = logging.getLogger("desktopenv.experiment")
 
 
@@ -14,32 +27,35 @@ def run_single_example(
     runtime_logger = setup_logger(example, example_result_dir)
     agent.reset()
     env.reset(task_config=example)
-    time.sleep(60)  # Wait for the environment to be ready
+    wait_for_env_ready(env)  # Wait for the environment to be ready
     obs = env._get_obs()  # Get the initial observation
     done = False
     step_idx = 0
     env.controller.start_recording()
-    while not done and step_idx < max_steps:
-        response, actions = agent.predict(instruction, obs)
-        for action in actions:
-            # Capture the timestamp before executing the action
-            action_timestamp = datetime.datetime.now().strftime("%Y%m%d@%H%M%S")
-            logger.info("Step %d: %s", step_idx + 1, action)
-            obs, reward, done, info = env.step(action, args.sleep_after_execution)
+    # Keep the trajectory file open for the whole example instead of
+    # reopening it for every action
+    with open(os.path.join(example_result_dir, "traj.jsonl"), "a") as traj_file:
+        while not done and step_idx < max_steps:
+            response, actions = agent.predict(instruction, obs)
+            for action in actions:
+                # Capture the timestamp before executing the action
+                action_timestamp = datetime.datetime.now().strftime("%Y%m%d@%H%M%S")
+                logger.info("Step %d: %s", step_idx + 1, action)
+                obs, reward, done, info = env.step(action, args.sleep_after_execution)
 
-            logger.info("Reward: %.2f", reward)
-            logger.info("Done: %s", done)
-            # Save screenshot and trajectory information
-            with open(
-                os.path.join(
-                    example_result_dir, f"step_{step_idx + 1}_{action_timestamp}.png"
-                ),
-                "wb",
-            ) as _f:
-                _f.write(obs["screenshot"])
-            with open(os.path.join(example_result_dir, "traj.jsonl"), "a") as f:
-                f.write(
-                    json.dumps(
+                logger.info("Reward: %.2f", reward)
+                logger.info("Done: %s", done)
+                # Save screenshot and trajectory information
+                with open(
+                    os.path.join(
+                        example_result_dir,
+                        f"step_{step_idx + 1}_{action_timestamp}.png",
+                    ),
+                    "wb",
+                ) as _f:
+                    _f.write(obs["screenshot"])
+                traj_file.write(
+                    _json_dumps(
                         {
                             "step_num": step_idx + 1,
                             "action_timestamp": action_timestamp,
@@ -51,11 +67,12 @@ def run_single_example(
                         }
                     )
                 )
-                f.write("\n")
-            if done:
-                logger.info("The episode is done.")
-                break
-        step_idx += 1
+                traj_file.write("\n")
+                traj_file.flush()
+                if done:
+                    logger.info("The episode is done.")
+                    break
+            step_idx += 1
     result = env.evaluate()
     logger.info("Result: %.2f", result)
     scores.append(result)
@@ -66,6 +83,30 @@ def run_single_example(
     env.controller.end_recording(os.path.join(example_result_dir, "recording.mp4"))
 
 
+def wait_for_env_ready(env, timeout=60.0, interval=2.0, min_settle=10.0):
+    """Wait for in-VM task setup to settle after reset.
+
+    Observations are served as soon as reset returns, so their mere presence
+    says nothing about setup (app launches, file operations) still running
+    inside the VM. Sleep a short fixed minimum, then poll until two
+    consecutive screenshots are identical, i.e. nothing is still launching
+    or drawing on screen."""
+    time.sleep(min_settle)
+    deadline = time.time() + timeout
+    previous_screenshot = None
+    while time.time() < deadline:
+        try:
+            obs = env._get_obs()
+            screenshot = obs.get("screenshot") if obs else None
+        except Exception:
+            screenshot = None
+        if screenshot is not None and screenshot == previous_screenshot:
+            return
+        previous_screenshot = screenshot
+        time.sleep(interval)
+    logger.warning("Screen still changing after %.0f seconds; continuing", timeout)
+
+
 def setup_logger(example, example_result_dir):
     runtime_logger = logging.getLogger(f"desktopenv.example.{example['id']}")
     runtime_logger.setLevel(logging.DEBUG)
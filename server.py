@@ -1,6 +1,7 @@
-import asyncio
 import os
 import platform
+
+import uvicorn
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -8,6 +9,7 @@ from gui_agents.s1.core.AgentS import GraphSearchAgent
 import io
 import pyautogui
 import time
+from PIL import Image
 from threading import Event, Lock
 
 # Determine the operating system and select appropriate ACI
@@ -36,6 +38,31 @@ agent_status = {"is_running": False, "current_instruction": None, "start_time":
 # Add a stop event
 stop_event = Event()
 
+# Reuse agents across requests: constructing a GraphSearchAgent reloads the
+# knowledge base, so keep one per engine configuration
+agent_cache = {}
+agent_cache_lock = Lock()
+
+
+def get_agent(engine_params: dict) -> GraphSearchAgent:
+    key = (
+        engine_params["engine_type"],
+        engine_params["model"],
+        engine_params.get("api_key"),
+    )
+    with agent_cache_lock:
+        agent = agent_cache.get(key)
+        if agent is None:
+            agent = GraphSearchAgent(
+                engine_params,
+                grounding_agent,
+                platform=current_platform,
+                action_space="pyautogui",
+                observation_type="mixed",
+            )
+            agent_cache[key] = agent
+    return agent
+
 
 class InstructionData(BaseModel):
     screenshot: str
@@ -56,7 +83,13 @@ class RunRequest(BaseModel):
 async def stream_code(code: str):
     for line in code.splitlines(keepends=True):
         yield line
-        await asyncio.sleep(0.1)
+
+
+def scale_screen_dimensions(width: int, height: int, max_dim_size: int):
+    scale_factor = min(max_dim_size / width, max_dim_size / height, 1)
+    safe_width = int(width * scale_factor)
+    safe_height = int(height * scale_factor)
+    return safe_width, safe_height
 
 
 def run_agent(agent: GraphSearchAgent, instruction: str):
@@ -65,6 +98,13 @@ def run_agent(agent: GraphSearchAgent, instruction: str):
     obs = {}
     traj = "Task:\n" + instruction
     subtask_traj = ""
+
+    # Re-scale screenshots so large displays do not blow up prompt size
+    screen_width, screen_height = pyautogui.size()
+    scaled_width, scaled_height = scale_screen_dimensions(
+        screen_width, screen_height, max_dim_size=2400
+    )
+
     for _ in range(15):
         # Check if stop was requested
         if stop_event.is_set():
@@ -78,6 +118,7 @@ def run_agent(agent: GraphSearchAgent, instruction: str):
         # Get screen shot using pyautogui.
         # Take a screenshot
         screenshot = pyautogui.screenshot()
+        screenshot = screenshot.resize((scaled_width, scaled_height), Image.LANCZOS)
 
         # Save the screenshot to a BytesIO object
         buffered = io.BytesIO()
@@ -112,11 +153,12 @@ def run_agent(agent: GraphSearchAgent, instruction: str):
             continue
 
         else:
-            time.sleep(1.0)
             print("EXECUTING CODE:", code[0])
 
             # Ask for permission before executing
             exec(code[0])
+            # The post-exec sleep already lets the UI settle before the next
+            # observation; the pre-exec pause was redundant
             time.sleep(1.0)
 
             # Update task and subtask trajectories and optionally the episodic memory
@@ -161,13 +203,7 @@ async def run(request: RunRequest):
 
         print("engine_params", engine_params)
 
-        agent = GraphSearchAgent(
-            engine_params,
-            grounding_agent,
-            platform=current_platform,
-            action_space="pyautogui",
-            observation_type="mixed",
-        )
+        agent = get_agent(engine_params)
 
         agent.reset()
         print("start the agent")
@@ -199,25 +235,32 @@ async def get_status():
 
 @app.post("/execute")
 async def execute_command_stream(cmd: CommandRequest):
-    engine_params = {
-        "engine_type": "openai",
-        "model": "gpt-4o",
-    }
-
-    agent = GraphSearchAgent(
-        engine_params,
-        grounding_agent,
-        platform=current_platform,
-        action_space="pyautogui",
-        observation_type="mixed",
-    )
+    # Cached agents must not be shared with a concurrent /run (or another
+    # /execute), so take the same lock before touching one
+    if not agent_lock.acquire(blocking=False):
+        raise HTTPException(
+            status_code=409,
+            detail="An agent is already running. Use /status to check current run or /stop to stop it.",
+        )
+
+    try:
+        engine_params = {
+            "engine_type": "openai",
+            "model": "gpt-4o",
+        }
 
-    obs = {
-        "screenshot": cmd.obs.screenshot,
-        "accessibility_tree": cmd.obs.accessibility_tree,
-    }
-    instruction = cmd.instruction
-    info, code = agent.predict(instruction=instruction, observation=obs)
+        agent = get_agent(engine_params)
+        # Clear planner state left over from a previous request
+        agent.reset()
+
+        obs = {
+            "screenshot": cmd.obs.screenshot,
+            "accessibility_tree": cmd.obs.accessibility_tree,
+        }
+        instruction = cmd.instruction
+        info, code = agent.predict(instruction=instruction, observation=obs)
+    finally:
+        agent_lock.release()
 
     return StreamingResponse(stream_code(code), media_type="text/plain")
 
@@ -232,8 +275,6 @@ async def stop_agent():
     return {"status": "stop signal sent"}
 
 
-import uvicorn
-
 if __name__ == "__main__":
     uvicorn.run(
         "server:app",